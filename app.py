@@ -3,6 +3,7 @@ import streamlit as st
 from streamlit_option_menu import option_menu
 import pyrebase
 import json
+from modules import reports, schema
 
 # -------------------------------------------------
 # 1. Load Firebase config from Streamlit Secrets
@@ -17,8 +18,36 @@ firebaseConfig = json.loads(st.secrets["firebase_config"])
 # 2. Initialise Pyrebase
 # -------------------------------------------------
 firebase = pyrebase.initialize_app(firebaseConfig)
-auth = firebase.auth()
-db = firebase.database()
+if st.secrets.get("auth_backend") == "standin":
+    # local RTDB stand-in (modules/rtdb_standin.py), used by loadtest.py
+    from modules.rtdb_standin import StandinAuth
+    auth = StandinAuth(firebaseConfig["databaseURL"])
+else:
+    auth = firebase.auth()
+
+# `db_backend = "rest"` in secrets switches to the asyncio REST client
+db_backend = st.secrets.get("db_backend", "pyrebase")
+if db_backend == "rest":
+    from modules.rtdb_async import RTDB
+
+    @st.cache_resource
+    def rest_client(database_url):
+        # one client (and connection pool) per server process, not per rerun
+        return RTDB(database_url)
+
+    rest_db = rest_client(firebaseConfig["databaseURL"])
+
+def open_database():
+    """Return a database handle for the configured backend.
+
+    Pyrebase handles keep per-call state, so background jobs should open
+    their own; the REST client is stateless and shared.
+    """
+    if db_backend == "rest":
+        return rest_db
+    return firebase.database()
+
+db = open_database()
 
 # -------------------------------------------------
 # 3. Page config
@@ -35,6 +64,7 @@ defaults = {
     "farm_name": "",
     "selected_page": "Dashboard",
     "user": None,
+    "quarantined": 0,
 }
 for k, v in defaults.items():
     if k not in st.session_state:
@@ -97,12 +127,16 @@ def login_page():
                     uid = user["localId"]
                     id_token = user["idToken"]
                     farm = db.child("users").child(uid).child("farm_name").get(token=id_token).val()
+                    counts = schema.migrate(db, uid, id_token)
+                    if counts:
+                        reports.schedule_refresh(open_database(), uid, id_token)
 
                     st.session_state.update({
                         "authenticated": True,
                         "user": user,
                         "farm_name": farm or "My Farm",
                         "selected_page": "Dashboard",
+                        "quarantined": sum(c["quarantined"] for c in counts.values()),
                     })
                     st.success("Login successful! Welcome back.")
                     st.rerun()
@@ -159,7 +193,14 @@ elif not st.session_state.authenticated:
     login_page()
 else:
     # === GO TO PAGES FOLDER ===
-    import os
+    import os, sys, types
+    # pages run `from app import db`; serve that from this script's globals
+    # instead of importing app.py a second time (which re-runs the router
+    # and renders the page twice)
+    if "app" not in sys.modules:
+        app_module = types.ModuleType("app")
+        app_module.__dict__.update(globals())
+        sys.modules["app"] = app_module
     page_path = f"pages/{st.session_state.selected_page}.py"
     if os.path.exists(page_path):
         with open(page_path) as f:
@@ -170,8 +211,17 @@ else:
     # === SIDEBAR: Only Welcome + Logout ===
     with st.sidebar:
         st.markdown(f"### Welcome, {st.session_state.farm_name}")
+        if st.session_state.quarantined:
+            st.warning(
+                f"{st.session_state.quarantined} record(s) could not be converted to the new "
+                "format and were moved to quarantine (users/<uid>/quarantine in Firebase)."
+            )
+            if st.button("Dismiss"):
+                st.session_state.quarantined = 0
+                st.rerun()
         if st.button("Logout"):
             for k in ["authenticated", "user", "farm_name"]:
                 st.session_state[k] = None if k != "authenticated" else False
+            st.session_state.quarantined = 0
             st.session_state.selected_page = "Dashboard"
             st.rerun()
\ No newline at end of file
@@ -0,0 +1,377 @@
+# loadtest.py
+"""Concurrent-session load test for the Streamlit app.
+
+Starts one ``streamlit run app.py`` server process against a local RTDB
+stand-in (``modules/rtdb_standin.py``). It then connects N simulated
+browsers to it over Streamlit's websocket protocol. Each session logs in
+through the login form, then repeatedly opens Dashboard, Reports and
+Records. On Records it adds a goat from the sidebar form and deletes
+it again.
+
+    python loadtest.py --sessions 20 --rounds 5 --records 200
+
+Reports throughput, p50/p95/p99 rerun latency, backend calls, and the
+server's memory growth per connected session. ``--json`` prints the
+same numbers machine-readably, for comparing runs.
+
+All sessions share the one server process. The numbers therefore
+include what a single instance pays under load: GIL contention between
+script threads, the shared report-refresh pool and the shared REST
+client loop.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import httpx
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from modules import schema
+from modules.rtdb_standin import StandinAuth, serve
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGES = ("Dashboard", "reports", "records")
+PASSWORD = "loadtest"
+RERUN = ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN
+
+
+# =============================================
+# 1. SEED DATA
+# =============================================
+def seed_farm(db_url, tree, n, records):
+    """Create account ``n`` on the stand-in with ``records`` rows per collection."""
+    email = f"farm{n}@loadtest.local"
+    user = StandinAuth(db_url).create_user_with_email_and_password(email, PASSWORD)
+    start = date(2024, 1, 1)
+    rows = {"goats": {}, "breeding": {}, "health": {}, "sales": {}}
+    for i in range(records):
+        day = start + timedelta(days=i % 600)
+        rows["goats"][f"g{i}"] = schema.normalize("goats", {
+            "tag_number": f"T{i}", "breed": "Boer", "gender": "Male" if i % 2 else "Female", "dob": day,
+        })
+        rows["breeding"][f"b{i}"] = schema.normalize("breeding", {
+            "female_id": f"T{i}", "male_id": "T1", "mating_date": day, "expected_birth": day + timedelta(days=150),
+        })
+        rows["health"][f"h{i}"] = schema.normalize("health", {
+            "goat_id": f"T{i}", "condition": schema.CONDITIONS[i % len(schema.CONDITIONS)], "checkup_date": day,
+        })
+        rows["sales"][f"s{i}"] = schema.normalize("sales", {
+            "goat_id": f"T{i}", "buyer_name": "Buyer", "price": 5000 + (i * 37) % 9000, "sale_date": day,
+        })
+    with tree.lock:
+        tree.set(f"users/{user['localId']}", {
+            "farm_name": f"Load Farm {n}",
+            "schema_version": schema.SCHEMA_VERSION,
+            "records": rows,
+        })
+    return email, user["localId"]
+
+
+# =============================================
+# 2. APP SERVER
+# =============================================
+def write_secrets(db_url):
+    """Secrets file pointing the app at the stand-in."""
+    firebase_config = json.dumps({
+        "apiKey": "loadtest",
+        "authDomain": "loadtest.local",
+        "databaseURL": db_url,
+        "storageBucket": "loadtest.local",
+    })
+    f = tempfile.NamedTemporaryFile("w", suffix=".toml", delete=False)
+    with f:
+        f.write(f"firebase_config = '{firebase_config}'\n")
+        f.write('db_backend = "rest"\n')
+        f.write('auth_backend = "standin"\n')
+    return f.name
+
+
+def start_app(secrets_file):
+    """Run ``streamlit run app.py`` headless; returns ``(process, port)``."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", "app.py",
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--secrets.files", secrets_file,
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/_stcore/health").status_code == 200:
+                return proc, port
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit server did not start")
+
+
+def rss_kib(pid, field="VmRSS"):
+    """Resident memory of ``pid`` in KiB (Linux ``/proc``)."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+# =============================================
+# 3. ONE SESSION (a simulated browser tab)
+# =============================================
+class Session:
+    def __init__(self, port, email, rounds):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.email = email
+        self.rounds = rounds
+        self.latencies = []
+        self.errors = []
+        self.pages = {}      # page name -> page_script_hash
+        self.page = ""
+        self.widgets = []    # (widget id, element type, label, in sidebar)
+        self.ws = None
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    def _record(self, msg, step):
+        kind = msg.WhichOneof("type")
+        if kind == "navigation":
+            self.pages = {p.page_name: p.page_script_hash for p in msg.navigation.app_pages}
+        elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+            element = msg.delta.new_element
+            etype = element.WhichOneof("type")
+            if etype == "exception":
+                self.errors.append(f"{step}: {element.exception.message}")
+                return
+            widget = getattr(element, etype)
+            widget_id = getattr(widget, "id", "")
+            if widget_id.startswith("$$ID-"):
+                sidebar = msg.metadata.delta_path[0] == 1
+                self.widgets.append((widget_id, etype, getattr(widget, "label", ""), sidebar))
+
+    async def rerun(self, step, states=(), page=None):
+        """Send one rerun request and wait until the script settles.
+
+        ``states`` is ``[(widget id, field, value)]``; runs ended early by
+        ``st.rerun()`` are followed through to the final run.
+        """
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.pages[page] if page else self.page
+        for widget_id, field, value in states:
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        self.widgets = []
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            if fwd.WhichOneof("type") == "script_finished":
+                if fwd.script_finished != RERUN:
+                    break
+                self.widgets = []
+                continue
+            self._record(fwd, step)
+        self.latencies.append(time.perf_counter() - started)
+        if page:
+            self.page = msg.rerun_script.page_script_hash
+
+    def find(self, etype, label=None, key=None, sidebar=None):
+        for widget_id, kind, widget_label, in_sidebar in self.widgets:
+            if kind != etype or (sidebar is not None and in_sidebar != sidebar):
+                continue
+            if label is not None and widget_label != label:
+                continue
+            if key is not None and key not in widget_id:
+                continue
+            return widget_id
+        raise KeyError(f"{etype} {label or key!r}")
+
+    async def login(self):
+        await self.rerun("open")
+        await self.rerun("login", [
+            (self.find("text_input", "Email"), "string_value", self.email),
+            (self.find("text_input", "Password"), "string_value", PASSWORD),
+            (self.find("button", key="FormSubmitter:login_form"), "trigger_value", True),
+        ])
+        try:
+            self.find("button", "Logout")
+        except KeyError:
+            self.errors.append("login: not authenticated")
+
+    def goat_rows(self):
+        return {w[0] for w in self.widgets if w[1] == "button" and "-del_goats_" in w[0]}
+
+    async def add_and_delete_goat(self, tag):
+        before = self.goat_rows()
+        form = self.find("selectbox", "Select Type", sidebar=True)
+        await self.rerun("select form", [(form, "string_value", "Goat")])
+        await self.rerun("submit goat", [
+            (form, "string_value", "Goat"),
+            (self.find("text_input", "Tag Number *", sidebar=True), "string_value", tag),
+            (self.find("text_input", "Breed *", sidebar=True), "string_value", "Saanen"),
+            (self.find("button", key="FormSubmitter:add_goat", sidebar=True), "trigger_value", True),
+        ])
+        # records are fetched before the sidebar form runs, so the new
+        # row only shows up on the next rerun
+        await self.rerun("show goat", [(form, "string_value", "Goat")])
+        added = self.goat_rows() - before
+        if len(added) != 1:
+            self.errors.append(f"delete: expected one new goat row, found {len(added)}")
+            return
+        await self.rerun("delete goat", [(added.pop(), "trigger_value", True)])
+
+    async def run(self):
+        try:
+            await self.connect()
+            await self.login()
+            for r in range(self.rounds):
+                for page in PAGES:
+                    await self.rerun(page, page=page)
+                await self.add_and_delete_goat(f"LT-{self.email.split('@')[0]}-{r}")
+        except KeyError as e:
+            # an expected widget was missing: the previous rerun went wrong
+            self.errors.append(f"widget missing ({e}) on page {self.page or 'main'}")
+        except websockets.ConnectionClosed as e:
+            self.errors.append(f"connection closed: {e}")
+        return self
+
+
+# =============================================
+# 4. DRIVER
+# =============================================
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def wait_idle(tree, quiet=1.0, timeout=120):
+    """Wait until the backend sees no calls for ``quiet`` seconds.
+
+    Report refreshes run on the server's background pool after the
+    writes; they are part of the load.
+    """
+    deadline = time.monotonic() + timeout
+    last, since = sum(tree.calls.values()), time.monotonic()
+    while time.monotonic() < deadline and time.monotonic() - since < quiet:
+        time.sleep(0.1)
+        now = sum(tree.calls.values())
+        if now != last:
+            last, since = now, time.monotonic()
+
+
+async def _measure(port, tree, pid, farms, rounds):
+    # one tab visits every page first, so imports and caches are paid
+    # for before the clock starts
+    warmup = await Session(port, farms[0][0], 1).run()
+    await warmup.close()
+    await asyncio.to_thread(wait_idle, tree)
+    tree.calls.clear()
+    rss_before = rss_kib(pid)
+
+    tabs = [Session(port, email, rounds) for email, _ in farms[1:]]
+    started = time.perf_counter()
+    await asyncio.gather(*(t.run() for t in tabs))
+    wall = time.perf_counter() - started
+    await asyncio.to_thread(wait_idle, tree)
+    # measured while every session is still connected
+    memory = {"before": rss_before, "after": rss_kib(pid), "peak": rss_kib(pid, "VmHWM")}
+    await asyncio.gather(*(t.close() for t in tabs))
+    return warmup, tabs, wall, memory
+
+
+def run(sessions, rounds, records):
+    server, url = serve()
+    secrets_file = write_secrets(url)
+    # farm 0 is the warm-up tab's
+    farms = [seed_farm(url, server.tree, n, records) for n in range(sessions + 1)]
+    proc, port = start_app(secrets_file)
+    try:
+        warmup, tabs, wall, memory = asyncio.run(_measure(port, server.tree, proc.pid, farms, rounds))
+    finally:
+        proc.terminate()
+        proc.wait()
+        server.shutdown()
+        os.unlink(secrets_file)
+
+    latencies = [l for t in tabs for l in t.latencies]
+    calls = Counter(server.tree.calls)
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "records_per_collection": records,
+        "reruns": len(latencies),
+        "wall_s": round(wall, 2),
+        "reruns_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        },
+        "backend_calls": dict(calls),
+        "backend_calls_per_rerun": round(sum(calls.values()) / len(latencies), 2) if latencies else 0.0,
+        "memory_per_session_kib": round((memory["after"] - memory["before"]) / sessions, 1),
+        "server_rss_mib": round(memory["after"] / 1024, 1),
+        "server_peak_rss_mib": round(memory["peak"] / 1024, 1),
+        "errors": warmup.errors + [e for t in tabs for e in t.errors],
+    }
+
+
+def print_report(result):
+    lat = result["latency_ms"]
+    print(f"Sessions:        {result['sessions']} x {result['rounds']} rounds "
+          f"({result['records_per_collection']} records/collection), one server process")
+    print(f"Reruns:          {result['reruns']} in {result['wall_s']} s "
+          f"-> {result['reruns_per_s']} reruns/s")
+    print(f"Rerun latency:   p50 {lat['p50']} ms | p95 {lat['p95']} ms | p99 {lat['p99']} ms")
+    print(f"Backend calls:   {result['backend_calls_per_rerun']} per rerun "
+          + ", ".join(f"{k}={v}" for k, v in sorted(result["backend_calls"].items())))
+    print(f"Memory:          {result['memory_per_session_kib']} KiB/session "
+          f"(server RSS {result['server_rss_mib']} MiB, peak {result['server_peak_rss_mib']} MiB)")
+    if result["errors"]:
+        print(f"Errors:          {len(result['errors'])}")
+        for e in result["errors"][:10]:
+            print(f"  - {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--records", type=int, default=100, help="seed rows per collection")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    result = run(args.sessions, args.rounds, args.records)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    sys.exit(1 if result["errors"] else 0)
@@ -0,0 +1,205 @@
+# modules/ai_logic.py
+"""Batched seasonal-trend forecasting with NumPy.
+
+Every series is a row of a ``(S, T)`` month grid: revenue per breed,
+births per breed, herd size per farm in a co-op, and so on. All rows
+share one design matrix:
+
+    [1, years since start, sin/cos of the calendar month (12-month period)]
+
+so every series is fitted in one pass. The masked normal equations are
+built with ``einsum`` and solved for the whole stack with one
+``np.linalg.solve``. Months before a series starts are masked out. Rows
+with fewer than ``MIN_SEASONAL`` observed months drop the seasonal
+columns, and rows with fewer than ``MIN_TREND`` drop the slope as well.
+
+    model = fit(months, Y)
+    out = model.forecast(3)             # next 1..3 months
+    out = model.forecast([1, 6, 12])   # chosen horizons only
+
+``forecast`` returns ``mean``/``lower``/``upper`` arrays of shape
+``(S, H)``. The interval is a normal prediction interval built from each
+row's residual spread and parameter uncertainty.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+GESTATION_DAYS = 150
+PERIOD = 12
+HARMONICS = 2
+MIN_SEASONAL = 2 * PERIOD
+MIN_TREND = 3
+RIDGE = 1e-9
+
+
+# =============================================
+# DATES
+# =============================================
+def day_to_month(days) -> np.ndarray:
+    """Epoch days -> months since 1970-01 (vectorised)."""
+    return np.asarray(days, dtype="int64").astype("datetime64[D]").astype("datetime64[M]").astype("int64")
+
+
+def month_label(month: int) -> str:
+    return str(np.datetime64(int(month), "M"))
+
+
+def predict_births(mating_days, gestation=GESTATION_DAYS) -> np.ndarray:
+    """Expected birth epoch days for an array of mating epoch days."""
+    return np.asarray(mating_days, dtype="int64") + gestation
+
+
+# =============================================
+# MODEL
+# =============================================
+def design(months, origin, harmonics=HARMONICS) -> np.ndarray:
+    """Design matrix for absolute ``months``; trend is in years since ``origin``."""
+    months = np.asarray(months, dtype=float)
+    cols = [np.ones_like(months), (months - origin) / PERIOD]
+    for k in range(1, harmonics + 1):
+        angle = 2 * np.pi * k * months / PERIOD
+        cols += [np.sin(angle), np.cos(angle)]
+    return np.stack(cols, axis=1)
+
+
+class SeasonalTrend:
+    """Fitted coefficients for a stack of series; see ``fit``."""
+
+    def __init__(self, origin, last_month, beta, cov, sigma, n_obs, harmonics):
+        self.origin = origin
+        self.last_month = last_month
+        self.beta = beta        # (S, p)
+        self.cov = cov          # (S, p, p) inverse of the masked normal matrix
+        self.sigma = sigma      # (S,) residual standard deviation
+        self.n_obs = n_obs      # (S,)
+        self.harmonics = harmonics
+
+    def forecast(self, horizons, level=0.95, floor=None) -> dict:
+        """Forecast ``horizons`` months ahead (an int means 1..n)."""
+        steps = np.arange(1, horizons + 1) if np.isscalar(horizons) else np.asarray(horizons)
+        months = self.last_month + steps
+        Xf = design(months, self.origin, self.harmonics)              # (H, p)
+        mean = self.beta @ Xf.T                                       # (S, H)
+        leverage = np.einsum("hp,spq,hq->sh", Xf, self.cov, Xf)
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        half = z * self.sigma[:, None] * np.sqrt(1 + leverage)
+        lower, upper = mean - half, mean + half
+        if floor is not None:
+            mean, lower, upper = (np.maximum(a, floor) for a in (mean, lower, upper))
+        return {"months": months, "mean": mean, "lower": lower, "upper": upper}
+
+
+def fit(months, Y, mask=None, harmonics=HARMONICS) -> SeasonalTrend:
+    """Fit every row of ``Y`` (``(S, T)`` over ``months``) at once.
+
+    ``mask`` marks observed cells; by default every non-NaN cell.
+    """
+    months = np.asarray(months)
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    W = ~np.isnan(Y) if mask is None else np.asarray(mask, dtype=bool)
+    W = W.astype(float)
+    Y = np.where(W > 0, np.nan_to_num(Y), 0.0)
+    origin = months[0]
+    X = design(months, origin, harmonics)                             # (T, p)
+    p = X.shape[1]
+
+    # per-row model size: intercept, + trend, + seasonal terms
+    n_obs = W.sum(axis=1)
+    active = np.zeros((len(Y), p))
+    active[:, 0] = 1
+    active[n_obs >= MIN_TREND, 1] = 1
+    active[n_obs >= MIN_SEASONAL, 2:] = 1
+
+    # masked normal equations; inactive columns solve to exactly zero
+    A = np.einsum("st,tp,tq->spq", W, X, X) * active[:, :, None] * active[:, None, :]
+    A += np.eye(p) * (1 - active)[:, :, None] + RIDGE * np.eye(p)
+    b = np.einsum("st,tp->sp", W * Y, X) * active
+    beta = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+
+    resid = (Y - beta @ X.T) * W
+    dof = np.maximum(n_obs - active.sum(axis=1), 1)
+    sigma = np.sqrt((resid ** 2).sum(axis=1) / dof)
+    cov = np.linalg.inv(A) * active[:, :, None] * active[:, None, :]
+    return SeasonalTrend(origin, months[-1], beta, cov, sigma, n_obs, harmonics)
+
+
+# =============================================
+# MONTHLY SERIES
+# =============================================
+def monthly_totals(keys, days, values=None, end_month=None):
+    """Sum ``values`` (default 1 per event) per series key and month.
+
+    Returns ``(names, months, Y)``. Months before a series' first event
+    are NaN; later months without events are 0. ``end_month`` closes the
+    window: the grid ends there and later events are left out.
+    """
+    keys = np.asarray(keys)
+    month = day_to_month(days)
+    values = np.ones(len(month)) if values is None else np.asarray(values, dtype=float)
+    if end_month is not None:
+        keep = month <= end_month
+        keys, month, values = keys[keep], month[keep], values[keep]
+    if not len(month):
+        return np.array([]), np.array([], dtype="int64"), np.zeros((0, 0))
+    names, row = np.unique(keys, return_inverse=True)
+    first = month.min()
+    last = month.max() if end_month is None else end_month
+    months = np.arange(first, last + 1)
+    Y = np.zeros((len(names), len(months)))
+    np.add.at(Y, (row, month - first), values)
+    starts = np.full(len(names), len(months))
+    np.minimum.at(starts, row, month - first)
+    Y[np.arange(len(months))[None, :] < starts[:, None]] = np.nan
+    return names, months, Y
+
+
+def monthly_levels(keys, days, deltas, end_month=None):
+    """Running level (e.g. herd size) from +/- ``deltas`` per key and month."""
+    names, months, flows = monthly_totals(keys, days, deltas, end_month)
+    return names, months, np.nancumsum(flows, axis=1) + np.where(np.isnan(flows), np.nan, 0)
+
+
+def farm_series(goats: dict, breeding: dict, sales: dict, end_month=None) -> dict:
+    """Revenue, births and herd size per breed, plus a ``"All"`` farm row.
+
+    Values are ``(names, months, Y)`` from ``monthly_totals``, all ending
+    at ``end_month``. ``"births_due"`` holds every known due date
+    (mating + gestation) without that cut-off, including future ones.
+    Only goats with a birth date join the herd, and only their sales take
+    it down again (other sales still count as revenue). Herd rows that
+    never rise above zero are left out.
+    """
+    breed_of = {g.get("tag_number"): g.get("breed") or "Unknown" for g in goats.values()}
+
+    sold = [s for s in sales.values() if isinstance(s.get("sale_date"), int) and s.get("price")]
+    sale_breed = [breed_of.get(s.get("goat_id"), "Unknown") for s in sold]
+    sale_day = [s["sale_date"] for s in sold]
+    mated = [b for b in breeding.values() if isinstance(b.get("mating_date"), int)]
+    birth_day = predict_births([b["mating_date"] for b in mated])
+    arrived = [g for g in goats.values() if isinstance(g.get("dob"), int)]
+    counted = {g.get("tag_number") for g in arrived}
+    left = [(b, d) for s, b, d in zip(sold, sale_breed, sale_day) if s.get("goat_id") in counted]
+
+    def with_total(breeds, days, values=None):
+        breeds = list(breeds) + ["All"] * len(breeds)
+        days = np.concatenate([days, days]) if len(days) else np.array([], dtype="int64")
+        if values is not None:
+            values = np.concatenate([values, values]) if len(values) else np.array([])
+        return breeds, days, values
+
+    herd = with_total(
+        [g.get("breed") or "Unknown" for g in arrived] + [b for b, _ in left],
+        np.array([g["dob"] for g in arrived] + [d for _, d in left], dtype="int64"),
+        np.array([1.0] * len(arrived) + [-1.0] * len(left)),
+    )
+    names, months, levels = monthly_levels(*herd, end_month=end_month)
+    kept = (levels > 0).any(axis=1)  # NaN compares False
+    births = with_total([breed_of.get(b.get("female_id"), "Unknown") for b in mated], birth_day)
+    return {
+        "revenue": monthly_totals(*with_total(sale_breed, np.array(sale_day, dtype="int64"),
+                                              np.array([s["price"] for s in sold], dtype=float)), end_month),
+        "births": monthly_totals(*births, end_month=end_month),
+        "births_due": monthly_totals(*births),
+        "herd": (names[kept], months, levels[kept]),
+    }
@@ -0,0 +1,228 @@
+# modules/leaderboard.py
+"""Top sales per farm, kept up to date on every sale write.
+
+Boards are stored next to the records, one per period:
+
+    users/<uid>/leaderboards/sales/all        all time
+    users/<uid>/leaderboards/sales/Y2026      calendar year
+    users/<uid>/leaderboards/sales/M2026-10   calendar month
+
+Each board holds the ``CAP`` highest-priced sales of its period (a little
+more than the ``TOP_K`` shown), so a delete rarely empties it below
+``TOP_K``. ``complete`` is true while every sale of the period fits on the
+board. An incomplete board only takes new sales that rank at or above its
+lowest entry, since cheaper ones may trail sales that are off the board.
+An incomplete board that drops below ``TOP_K`` is rebuilt from the
+records. Missing boards (older farms, new periods) are built the same way
+on first read, so reading a leaderboard costs O(CAP) whatever the sales
+history.
+
+Updates are read-modify-write under a per-farm lock, so farms never wait
+on each other's round trips. Two app instances writing the same farm at
+the same moment can lose one update; deleting the board node forces a
+rebuild.
+"""
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from datetime import date
+
+from modules.query import Query
+from modules.schema import from_epoch_day, to_epoch_day
+
+TOP_K = 5
+CAP = 20
+
+log = logging.getLogger(__name__)
+_locks = defaultdict(threading.Lock)
+_locks_guard = threading.Lock()
+
+
+def _lock_for(uid):
+    with _locks_guard:
+        return _locks[uid]
+
+
+# =============================================
+# PERIODS
+# =============================================
+def periods(sale_date=None) -> list:
+    """Board keys a sale on ``sale_date`` (epoch day) belongs to."""
+    if sale_date is None:
+        return ["all"]
+    d = from_epoch_day(sale_date)
+    return ["all", f"Y{d.year}", f"M{d.year}-{d.month:02d}"]
+
+
+def _bounds(period):
+    """First and last epoch day of a ``Y``/``M`` period."""
+    if period.startswith("Y"):
+        year = int(period[1:])
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    else:
+        year, month = (int(p) for p in period[1:].split("-"))
+        start = date(year, month, 1)
+        end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return to_epoch_day(start), to_epoch_day(end) - 1
+
+
+# =============================================
+# BOARD
+# =============================================
+class TopK:
+    """Min-heap of the ``CAP`` highest-priced sales."""
+
+    def __init__(self, entries=None, complete=True):
+        self.entries = dict(entries or {})
+        self.complete = complete
+        self.heap = [(e["price"], rid) for rid, e in self.entries.items()]
+        heapq.heapify(self.heap)
+
+    def push(self, rid, entry):
+        self.discard(rid)
+        item = (entry["price"], rid)
+        if not self.complete and (not self.heap or item < self.heap[0]):
+            # sales that are off the board may outrank it; leave it out
+            return
+        if len(self.heap) < CAP:
+            heapq.heappush(self.heap, item)
+            self.entries[rid] = entry
+            return
+        # full: the period now has sales that are not on the board
+        self.complete = False
+        if item > self.heap[0]:
+            _, evicted = heapq.heapreplace(self.heap, item)
+            del self.entries[evicted]
+            self.entries[rid] = entry
+
+    def discard(self, rid) -> bool:
+        if rid not in self.entries:
+            return False
+        del self.entries[rid]
+        self.heap = [item for item in self.heap if item[1] != rid]
+        heapq.heapify(self.heap)
+        return True
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return not self.complete and len(self.entries) < TOP_K
+
+    def top(self, k=TOP_K) -> list:
+        return [self.entries[rid] for _, rid in heapq.nlargest(k, self.heap)]
+
+    def to_stored(self) -> dict:
+        return {"complete": self.complete, "entries": self.entries}
+
+
+def _entry(sale):
+    entry = {"goat_id": sale.get("goat_id", "—"), "price": float(sale["price"])}
+    if sale.get("sale_date") is not None:
+        entry["sale_date"] = sale["sale_date"]
+    return entry
+
+
+def _has_price(sale):
+    return isinstance(sale, dict) and isinstance(sale.get("price"), (int, float))
+
+
+# =============================================
+# STORAGE
+# =============================================
+def _boards_ref(db, uid):
+    return db.child("users").child(uid).child("leaderboards").child("sales")
+
+
+def _load(db, uid, token, period):
+    stored = _boards_ref(db, uid).child(period).get(token=token).val()
+    if not isinstance(stored, dict):
+        return None
+    return TopK(stored.get("entries"), stored.get("complete", False))
+
+
+def _build(db, uid, token, period):
+    """Rebuild one board from the records and save it."""
+    if period == "all":
+        # one past CAP tells us whether anything was left out
+        ref = db.child("users").child(uid).child("records").child("sales")
+        rows = ref.order_by_child("price").limit_to_last(CAP + 1).get(token=token).val() or {}
+    else:
+        rows = Query("sales").between("sale_date", *_bounds(period)).fetch(db, uid, token)
+    board = TopK()
+    for rid, sale in rows.items():
+        if _has_price(sale):
+            board.push(rid, _entry(sale))
+    _boards_ref(db, uid).child(period).set(board.to_stored(), token=token)
+    return board
+
+
+def _forget(db, uid, token, keys):
+    """Drop boards after a failed update so the next read rebuilds them."""
+    try:
+        _boards_ref(db, uid).update({k: None for k in keys}, token=token)
+    except Exception:
+        log.exception("Could not reset sales leaderboards for %s", uid)
+
+
+# =============================================
+# UPDATES
+# =============================================
+def record_sale(db, uid, token, rid, sale):
+    """Add a sale that has just been written to ``records/sales/<rid>``."""
+    if not _has_price(sale):
+        return
+    keys = periods(sale.get("sale_date"))
+    try:
+        with _lock_for(uid):
+            payload = {}
+            for period in keys:
+                board = _load(db, uid, token, period)
+                if board is None:
+                    _build(db, uid, token, period)  # already includes the sale
+                    continue
+                board.push(rid, _entry(sale))
+                payload[period] = board.to_stored()
+            if payload:
+                _boards_ref(db, uid).update(payload, token=token)
+    except Exception:
+        log.exception("Leaderboard update failed for %s", uid)
+        _forget(db, uid, token, keys)
+
+
+def remove_sale(db, uid, token, rid, sale):
+    """Take a deleted sale off its boards."""
+    keys = periods((sale or {}).get("sale_date"))
+    try:
+        with _lock_for(uid):
+            payload = {}
+            for period in keys:
+                board = _load(db, uid, token, period)
+                if board is None or not board.discard(rid):
+                    continue
+                # too few left to fill the top K: rebuild on next read
+                payload[period] = None if board.needs_rebuild else board.to_stored()
+            if payload:
+                _boards_ref(db, uid).update(payload, token=token)
+    except Exception:
+        log.exception("Leaderboard update failed for %s", uid)
+        _forget(db, uid, token, keys)
+
+
+# =============================================
+# READ
+# =============================================
+def top(db, uid, token, period="all", k=TOP_K) -> list:
+    """Highest sales of ``period``, best first, as ``{goat_id, price, date}``."""
+    board = _load(db, uid, token, period)
+    if board is None or board.needs_rebuild:
+        # the rebuild writes the board, so it must not race a sale update
+        with _lock_for(uid):
+            board = _build(db, uid, token, period)
+    return [
+        {
+            "goat_id": e.get("goat_id", "—"),
+            "price": e["price"],
+            "date": from_epoch_day(e["sale_date"]).isoformat() if "sale_date" in e else "—",
+        }
+        for e in board.top(k)
+    ]
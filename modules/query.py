@@ -0,0 +1,182 @@
+# modules/query.py
+"""Server-side filtering for the ``users/<uid>/records/<collection>`` lists.
+
+    Query("sales").between("sale_date", to_epoch_day("2025-01-01"), to_epoch_day("2025-03-31")).fetch(db, uid, token)
+
+Use ``fetch`` where the collection is not otherwise loaded (e.g. the
+leaderboard rebuilds in ``modules/leaderboard.py``); on rows that are
+already in memory, ``filter`` gives the same result without a round trip.
+
+The first condition is pushed down to RTDB as ``orderBy`` plus
+``startAt``/``endAt``/``equalTo`` (RTDB can only order by one child per
+query). Every condition is then re-checked on the returned rows, which
+handles the extra conditions, strict ``<``/``>`` and rows that are missing
+the field. Results are ordered by the first condition's field (by key
+without conditions) and ``limit`` keeps the first ``n``. It becomes
+``limitToFirst`` only for a single non-strict condition, where the
+re-check cannot drop rows; other limited queries fetch every match.
+
+Pushed-down fields need an ``.indexOn`` rule; ``INDEXES`` lists them and
+``python -m modules.query`` regenerates ``database.rules.json``.
+"""
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from modules.rtdb_async import order_items
+
+# fields queried server-side, per collection: the sales leaderboard
+# rebuilds (modules/leaderboard.py) order by price and by sale_date
+INDEXES = {
+    "sales": ["price", "sale_date"],
+}
+
+OPS = ("==", "<", "<=", ">", ">=", "between", "in")
+
+
+def _comparable(a, b):
+    numeric = (int, float)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool)
+    return (isinstance(a, numeric) and isinstance(b, numeric)) or (
+        isinstance(a, str) and isinstance(b, str)
+    )
+
+
+def _test(actual, op, value):
+    if op == "in":
+        return actual in value
+    if op == "between":
+        low, high = value
+        return _comparable(actual, low) and _comparable(actual, high) and low <= actual <= high
+    if not _comparable(actual, value):
+        return False
+    if op == "==":
+        return actual == value
+    if op == "<":
+        return actual < value
+    if op == "<=":
+        return actual <= value
+    if op == ">":
+        return actual > value
+    return actual >= value
+
+
+class Query:
+    """Immutable query builder; each method returns a new ``Query``."""
+
+    def __init__(self, collection, conditions=(), limit_n=None):
+        self.collection = collection
+        self.conditions = tuple(conditions)
+        self.limit_n = limit_n
+
+    def where(self, field, op, value):
+        if op not in OPS:
+            raise ValueError(f"Unsupported operator: {op}")
+        if op in ("between", "in"):
+            value = tuple(value)
+        return Query(self.collection, self.conditions + ((field, op, value),), self.limit_n)
+
+    def between(self, field, low, high):
+        return self.where(field, "between", (low, high))
+
+    def limit(self, n):
+        return Query(self.collection, self.conditions, n)
+
+    # ----- CLIENT SIDE -----
+    def matches(self, record) -> bool:
+        if not isinstance(record, dict):
+            return False
+        return all(
+            field in record and _test(record[field], op, value)
+            for field, op, value in self.conditions
+        )
+
+    def filter(self, records: dict) -> OrderedDict:
+        """Apply the query to rows already in memory, in ``fetch`` order."""
+        rows = [(rid, rec) for rid, rec in (records or {}).items() if self.matches(rec)]
+        rows = order_items(rows, self.conditions[0][0] if self.conditions else "$key")
+        if self.limit_n is not None:
+            rows = rows[: self.limit_n]
+        return OrderedDict(rows)
+
+    # ----- SERVER SIDE -----
+    def _plans(self):
+        """One list of ``(method, args)`` query steps per request to make."""
+        limit = []
+        strict = any(op in ("<", ">") for _, op, _ in self.conditions)
+        if self.limit_n is not None and len(self.conditions) <= 1 and not strict:
+            # nothing is re-checked away, so the first n on the server are the answer
+            limit = [("limit_to_first", (self.limit_n,))]
+        if not self.conditions:
+            return [[("order_by_key", ())] + limit]
+
+        field, op, value = self.conditions[0]
+        order = [("order_by_child", (field,))]
+        if op == "in":
+            bounds = [[("equal_to", (v,))] for v in value]
+        elif op == "==":
+            bounds = [[("equal_to", (value,))]]
+        elif op in (">", ">="):
+            bounds = [[("start_at", (value,))]]
+        elif op in ("<", "<="):
+            # lower bound keeps rows without the field (null sorts first) out
+            floor = "" if isinstance(value, str) else -sys.float_info.max
+            bounds = [[("start_at", (floor,)), ("end_at", (value,))]]
+        else:
+            bounds = [[("start_at", (value[0],)), ("end_at", (value[1],))]]
+        return [order + b + limit for b in bounds]
+
+    def fetch(self, db, uid, token) -> OrderedDict:
+        """Run the query against ``users/<uid>/records/<collection>``."""
+        rows = OrderedDict()
+        for plan in self._plans():
+            # pyrebase refs are mutable, so build the chain afresh per request
+            ref = db.child("users").child(uid).child("records").child(self.collection)
+            for method, args in plan:
+                ref = getattr(ref, method)(*args)
+            found = ref.get(token=token).val()
+            if isinstance(found, dict):
+                rows.update(found)
+        return self.filter(rows)
+
+
+# =============================================
+# RULES
+# =============================================
+def build_rules() -> dict:
+    """Security rules for the ``users/<uid>`` and ``telemetry/<uid>``
+    layouts plus ``.indexOn``."""
+    owner = "auth != null && auth.uid === $uid"
+    return {
+        "rules": {
+            # sensor data (modules/telemetry.py) lives outside users/<uid>
+            # so reading a user node never downloads it
+            "telemetry": {
+                "$uid": {".read": owner, ".write": owner},
+            },
+            "users": {
+                "$uid": {
+                    ".read": owner,
+                    ".write": owner,
+                    "records": {
+                        collection: {".indexOn": fields}
+                        for collection, fields in sorted(INDEXES.items())
+                    },
+                }
+            }
+        }
+    }
+
+
+def write_rules(path="database.rules.json"):
+    with open(path, "w") as f:
+        json.dump(build_rules(), f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    out = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database.rules.json")
+    write_rules(out)
+    print(f"Wrote {out}")
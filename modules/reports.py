@@ -0,0 +1,261 @@
+# modules/reports.py
+"""Precomputed report snapshots for ``pages/reports.py``.
+
+The Reports page used to compute every section inline on each rerun.
+``build_snapshot`` now does that work once and stores the result at
+``users/<uid>/reports/latest``, so the page can render at once. The
+snapshot is rebuilt off the request thread in two cases: after record
+writes (``schedule_refresh``) and when the page finds it older than
+``STALE_AFTER``.
+
+Snapshots carry ``SNAPSHOT_VERSION``; one written by an older layout is
+treated as missing and rebuilt. Highest sales are not part of the
+snapshot; they come from ``modules/leaderboard.py``.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from modules import ai_logic
+from modules.schema import from_epoch_day, to_epoch_day
+
+SNAPSHOT_VERSION = 5
+STALE_AFTER = timedelta(minutes=15)
+COLLECTIONS = ("goats", "breeding", "sales", "health")
+
+log = logging.getLogger(__name__)
+
+
+# =============================================
+# SECTIONS
+# =============================================
+# --- 2️⃣ Predictive Birth Dates ---
+def predicted_births(breeding: dict) -> list:
+    """Predicted birth dates (mating + 150 days), soonest first.
+
+    Days left are worked out when rendering, so an older snapshot
+    still shows correct countdowns.
+    """
+    mated = [b for b in breeding.values() if "mating_date" in b]
+    days = ai_logic.predict_births([b["mating_date"] for b in mated])
+    preds = sorted(zip(days.tolist(), (b.get("female_id", "—") for b in mated)))
+    return [
+        {"female": female, "predicted_birth": from_epoch_day(day).isoformat()}
+        for day, female in preds
+    ]
+
+
+def _sales_frame(sales: dict) -> pd.DataFrame:
+    df = pd.DataFrame([
+        {"Date": s["sale_date"], "Price": s["price"]}
+        for s in sales.values() if s.get("price") and "sale_date" in s
+    ], columns=["Date", "Price"])
+    df["Date"] = pd.to_datetime(df["Date"], unit="D")
+    return df
+
+
+# --- 3️⃣ ML: Detect Sales Anomalies ---
+def detect_anomalies(sales: dict) -> dict:
+    if not sales:
+        return {"status": "no_data", "outliers": []}
+    df = _sales_frame(sales)
+    if len(df) <= 5:
+        return {"status": "insufficient", "outliers": []}
+    X = np.array(df["Price"]).reshape(-1, 1)
+    model = IsolationForest(contamination=0.2, random_state=42)
+    model.fit(X)
+    outliers = df[model.predict(X) == -1]
+    return {
+        "status": "outliers" if not outliers.empty else "ok",
+        "outliers": [
+            {"date": d.date().isoformat(), "price": float(p)}
+            for d, p in zip(outliers["Date"], outliers["Price"])
+        ],
+    }
+
+
+def _last_full_month():
+    return int(ai_logic.day_to_month(to_epoch_day(datetime.now().date()))) - 1
+
+
+def _forecast_rows(names, model, horizon, value_key):
+    out = model.forecast(horizon, floor=0.0)
+    return [
+        {
+            "series": str(name),
+            "month": ai_logic.month_label(month),
+            value_key: round(float(out["mean"][s, h]), 2),
+            "lower": round(float(out["lower"][s, h]), 2),
+            "upper": round(float(out["upper"][s, h]), 2),
+        }
+        for s, name in enumerate(names)
+        for h, month in enumerate(out["months"])
+    ]
+
+
+# --- 4️⃣ ML: Predict Future Revenue (seasonal trend, modules/ai_logic.py) ---
+def predict_revenue(sales: dict, horizon: int = 3) -> dict:
+    if not sales:
+        return {"status": "no_data", "forecast": []}
+    df = _sales_frame(sales)
+    if df.empty:
+        return {"status": "no_valid", "forecast": []}
+
+    days = (df["Date"] - pd.Timestamp(0)).dt.days.to_numpy()
+    names, months, Y = ai_logic.monthly_totals(np.zeros(len(days)), days, df["Price"].to_numpy(),
+                                               end_month=_last_full_month())
+    if np.count_nonzero(np.nan_to_num(Y)) < ai_logic.MIN_TREND:
+        return {"status": "insufficient", "forecast": []}
+    rows = _forecast_rows(names, ai_logic.fit(months, Y), horizon, "revenue")
+    return {"status": "ok", "forecast": [{k: v for k, v in r.items() if k != "series"} for r in rows]}
+
+
+# --- 4️⃣b Herd & births outlook per breed (one batched fit each) ---
+def outlook(goats: dict, breeding: dict, sales: dict, horizon: int = 3) -> dict:
+    """Forecasts for the ``horizon`` months after the last full month.
+
+    Both series are fitted up to the same month, so the tables cover the
+    same months. Births rows also carry ``scheduled``: due dates already
+    known from breeding records for that month.
+    """
+    series = ai_logic.farm_series(goats, breeding, sales, end_month=_last_full_month())
+    out = {}
+    for name in ("herd", "births"):
+        names, months, Y = series[name]
+        usable = (~np.isnan(Y)).sum(axis=1) >= ai_logic.MIN_TREND if len(months) else []
+        if not np.any(usable):
+            out[name] = []
+            continue
+        out[name] = _forecast_rows(names[usable], ai_logic.fit(months, Y[usable]), horizon, "value")
+
+    due_names, due_months, due = series["births_due"]
+    scheduled = {
+        (str(name), ai_logic.month_label(month)): int(count)
+        for name, row in zip(due_names, due)
+        for month, count in zip(due_months, np.nan_to_num(row)) if count
+    }
+    for row in out["births"]:
+        row["scheduled"] = scheduled.get((row["series"], row["month"]), 0)
+    return out
+
+
+# --- 5️⃣ AI Insights ---
+def recommendations(goats: dict, breeding: dict, sales: dict, health: dict) -> list:
+    recs = []
+    total_goats = len(goats)
+    total_sales = sum(s.get("price", 0) for s in sales.values())
+    sick_goats = [h for h in health.values() if h.get("condition") == "sick"]
+
+    if total_goats > 0 and breeding:
+        pregnant = sum(1 for b in breeding.values() if "mating_date" in b)
+        ratio = pregnant / total_goats
+        if ratio < 0.2:
+            recs.append("🔁 Low breeding ratio — consider synchronizing mating schedules.")
+        elif ratio > 0.6:
+            recs.append("🐐 High pregnancy rate — prepare for upcoming births.")
+
+    if sick_goats:
+        recs.append(f"⚕️ {len(sick_goats)} goat(s) recently reported sick — check isolation and treatment.")
+    else:
+        recs.append("✅ All goats appear healthy.")
+
+    if total_sales > 0:
+        recs.append(f"💰 Revenue so far: Ksh {total_sales:,.0f}. Maintain this momentum!")
+    if total_goats < 5:
+        recs.append("📉 Low herd size — consider acquiring more goats for better yield.")
+    return recs
+
+
+def build_snapshot(goats: dict, breeding: dict, sales: dict, health: dict) -> dict:
+    goats, breeding, sales, health = (c or {} for c in (goats, breeding, sales, health))
+    return {
+        "version": SNAPSHOT_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "births": predicted_births(breeding),
+        "anomalies": detect_anomalies(sales),
+        "revenue": predict_revenue(sales),
+        "outlook": outlook(goats, breeding, sales),
+        "recommendations": recommendations(goats, breeding, sales, health),
+        "summary": {
+            "goats": len(goats),
+            "breeding": len(breeding),
+            "sales": len(sales),
+            "health": len(health),
+        },
+    }
+
+
+# =============================================
+# STORAGE
+# =============================================
+def _reports_ref(db, uid):
+    return db.child("users").child(uid).child("reports").child("latest")
+
+
+def load_latest(db, uid, token):
+    """Latest stored snapshot, or None if missing or from an older layout."""
+    snap = _reports_ref(db, uid).get(token=token).val()
+    if not isinstance(snap, dict) or snap.get("version") != SNAPSHOT_VERSION:
+        return None
+    return snap
+
+
+def snapshot_age(snap: dict) -> timedelta:
+    return datetime.now() - datetime.fromisoformat(snap["generated_at"])
+
+
+def refresh(db, uid, token) -> dict:
+    """Recompute the snapshot from the stored records and save it."""
+    records = {}
+    for name in COLLECTIONS:
+        records[name] = db.child("users").child(uid).child("records").child(name).get(token=token).val() or {}
+    snap = build_snapshot(**records)
+    _reports_ref(db, uid).set(snap, token=token)
+    return snap
+
+
+# =============================================
+# BACKGROUND JOB
+# =============================================
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="reports")
+_lock = threading.Lock()
+_dirty = {}      # uid -> (db, token) for the next run
+_running = set()
+
+
+def _worker(uid):
+    while True:
+        with _lock:
+            if uid not in _dirty:
+                _running.discard(uid)
+                return
+            db, token = _dirty.pop(uid)
+        try:
+            refresh(db, uid, token)
+        except Exception:
+            log.exception("Report refresh failed for %s", uid)
+
+
+def schedule_refresh(db, uid, token):
+    """Queue a rebuild for ``uid`` without blocking the caller.
+
+    Calls made while a rebuild is running are coalesced into one more
+    run after it, so the last write is always reflected. Pass a database
+    handle the caller does not share (``app.open_database()``).
+    """
+    with _lock:
+        _dirty[uid] = (db, token)
+        if uid in _running:
+            return
+        _running.add(uid)
+    _executor.submit(_worker, uid)
+
+
+def is_refreshing(uid) -> bool:
+    with _lock:
+        return uid in _running
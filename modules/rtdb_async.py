@@ -0,0 +1,328 @@
+# modules/rtdb_async.py
+"""Asyncio Realtime Database REST client.
+
+Drop-in alternative to ``firebase.database()`` from pyrebase: the same
+``child(...).get/set/update/push/remove(token=...)`` chain the pages use,
+built on ``httpx.AsyncClient`` so many reads can be awaited together.
+
+``AsyncRTDB`` is for asyncio code (batch jobs, fan-out fetches).
+``RTDB`` wraps it for Streamlit script threads: every call is run on one
+shared background event loop, so the connection pool is reused across
+reruns and sessions.
+"""
+import asyncio
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import httpx
+
+try:  # per-child JSON decode for large subtrees (in requirements.txt)
+    import ijson
+except ImportError:
+    ijson = None
+
+_WHITESPACE = b" \t\r\n"
+_INT_KEY = re.compile(r"-?(0|[1-9][0-9]*)")
+
+
+# -------------------------------------------------
+# Ordering and response (mirrors pyrebase's PyreResponse.val()/key())
+# -------------------------------------------------
+def sort_key(value):
+    """RTDB ordering: null < false < true < numbers < strings < objects."""
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+
+def key_order(key):
+    """RTDB key ordering: 32-bit integer keys first, numerically, then strings."""
+    key = str(key)
+    if _INT_KEY.fullmatch(key) and -2**31 <= int(key) < 2**31:
+        return (0, int(key), "")
+    return (1, 0, key)
+
+
+def order_items(items, order_by):
+    """Sort ``(key, value)`` pairs the way RTDB orders a query result."""
+    if order_by == "$key":
+        return sorted(items, key=lambda kv: key_order(kv[0]))
+    if order_by == "$value":
+        return sorted(items, key=lambda kv: (sort_key(kv[1]), key_order(kv[0])))
+    return sorted(
+        items,
+        key=lambda kv: (sort_key(kv[1].get(order_by) if isinstance(kv[1], dict) else None), key_order(kv[0])),
+    )
+
+
+class RTDBResponse:
+    def __init__(self, value, key=None):
+        self._value = value
+        self._key = key
+
+    def val(self):
+        return self._value
+
+    def key(self):
+        return self._key
+
+    def each(self):
+        if not isinstance(self._value, dict):
+            return []
+        return [RTDBResponse(v, k) for k, v in self._value.items()]
+
+
+class _StreamReader:
+    """Async file-like adapter over an httpx byte stream, for ijson."""
+
+    def __init__(self, response):
+        self._chunks = response.aiter_bytes()
+        self._buf = b""
+
+    async def peek(self):
+        """First non-whitespace byte of the body, without consuming it."""
+        while not self._buf.lstrip(_WHITESPACE):
+            try:
+                self._buf += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+        return self._buf.lstrip(_WHITESPACE)[:1]
+
+    async def read(self, n=-1):
+        while n < 0 or len(self._buf) < n:
+            try:
+                self._buf += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                break
+        if n < 0:
+            data, self._buf = self._buf, b""
+        else:
+            data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+
+async def _decode(response):
+    """Decode a GET body; objects are built one child at a time.
+
+    With ijson, only the current child is ever held as raw text, so a
+    large subtree never sits in memory as both bytes and objects.
+    """
+    reader = _StreamReader(response)
+    if ijson is not None and await reader.peek() == b"{":
+        value = OrderedDict()
+        async for key, child in ijson.kvitems_async(reader, "", use_float=True):
+            value[key] = child
+        return value
+    body = await reader.read()
+    return json.loads(body) if body.strip() else None
+
+
+# -------------------------------------------------
+# Async client
+# -------------------------------------------------
+class AsyncRef:
+    """Immutable database reference; ``child`` and the query methods
+    return a new ref."""
+
+    def __init__(self, db, path=(), query=None):
+        self._db = db
+        self._path = tuple(path)
+        self._query = query or {}
+
+    def child(self, *args):
+        parts = [str(a).strip("/") for a in args if str(a).strip("/")]
+        return AsyncRef(self._db, self._path + tuple(parts), self._query)
+
+    def _with(self, **query):
+        return AsyncRef(self._db, self._path, {**self._query, **query})
+
+    # ----- QUERIES (same names as pyrebase) -----
+    def order_by_child(self, field):
+        return self._with(orderBy=field)
+
+    def order_by_key(self):
+        return self._with(orderBy="$key")
+
+    def order_by_value(self):
+        return self._with(orderBy="$value")
+
+    def start_at(self, value):
+        return self._with(startAt=value)
+
+    def end_at(self, value):
+        return self._with(endAt=value)
+
+    def equal_to(self, value):
+        return self._with(equalTo=value)
+
+    def limit_to_first(self, n):
+        return self._with(limitToFirst=n)
+
+    def limit_to_last(self, n):
+        return self._with(limitToLast=n)
+
+    def shallow(self):
+        return self._with(shallow=True)
+
+    @property
+    def path(self):
+        return "/".join(self._path)
+
+    def _params(self, token, **extra):
+        params = {k: json.dumps(v) for k, v in self._query.items()}
+        if "shallow" in params:
+            params["shallow"] = "true"
+        params.update(extra)
+        if token:
+            params["auth"] = token
+        return params
+
+    async def get(self, token=None):
+        client = self._db.client()
+        async with client.stream("GET", self._db.url(self.path), params=self._params(token)) as resp:
+            resp.raise_for_status()
+            value = await _decode(resp)
+        order_by = self._query.get("orderBy")
+        if order_by and isinstance(value, dict):
+            value = OrderedDict(order_items(value.items(), order_by))
+        key = self._path[-1] if self._path else None
+        return RTDBResponse(value, key)
+
+    async def set(self, data, token=None):
+        resp = await self._db.client().put(
+            self._db.url(self.path), params=self._params(token, print="silent"), json=data
+        )
+        resp.raise_for_status()
+
+    async def update(self, data, token=None):
+        resp = await self._db.client().patch(
+            self._db.url(self.path), params=self._params(token, print="silent"), json=data
+        )
+        resp.raise_for_status()
+
+    async def push(self, data, token=None):
+        resp = await self._db.client().post(
+            self._db.url(self.path), params=self._params(token), json=data
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    async def remove(self, token=None):
+        resp = await self._db.client().delete(
+            self._db.url(self.path), params=self._params(token, print="silent")
+        )
+        resp.raise_for_status()
+
+
+class AsyncRTDB:
+    """Entry point: ``AsyncRTDB(databaseURL).child("users").child(uid)``.
+
+    The underlying ``httpx.AsyncClient`` is created lazily inside the
+    running loop, so one instance must only be used from one event loop.
+    """
+
+    def __init__(self, database_url, timeout=30.0, max_connections=100):
+        self.database_url = database_url.rstrip("/")
+        self._timeout = timeout
+        self._limits = httpx.Limits(max_connections=max_connections)
+        self._client = None
+
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits)
+        return self._client
+
+    def url(self, path):
+        return f"{self.database_url}/{path}.json" if path else f"{self.database_url}/.json"
+
+    def child(self, *args):
+        return AsyncRef(self).child(*args)
+
+    async def get_many(self, paths, token=None):
+        """Fetch several paths concurrently; returns ``{path: value}``."""
+        refs = [self.child(*p.split("/")) for p in paths]
+        results = await asyncio.gather(*(r.get(token=token) for r in refs))
+        return OrderedDict((p, r.val()) for p, r in zip(paths, results))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# -------------------------------------------------
+# Sync facade for Streamlit script threads
+# -------------------------------------------------
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="rtdb-async", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared background loop and wait for it."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+_QUERY_METHODS = {
+    "order_by_child", "order_by_key", "order_by_value", "start_at", "end_at",
+    "equal_to", "limit_to_first", "limit_to_last", "shallow",
+}
+
+
+class Ref:
+    def __init__(self, aref):
+        self._aref = aref
+
+    def child(self, *args):
+        return Ref(self._aref.child(*args))
+
+    def __getattr__(self, name):
+        # query builders (order_by_child, start_at, ...) wrap the new ref
+        if name not in _QUERY_METHODS:
+            raise AttributeError(name)
+        method = getattr(self._aref, name)
+        return lambda *args: Ref(method(*args))
+
+    def get(self, token=None):
+        return run_sync(self._aref.get(token=token))
+
+    def set(self, data, token=None):
+        return run_sync(self._aref.set(data, token=token))
+
+    def update(self, data, token=None):
+        return run_sync(self._aref.update(data, token=token))
+
+    def push(self, data, token=None):
+        return run_sync(self._aref.push(data, token=token))
+
+    def remove(self, token=None):
+        return run_sync(self._aref.remove(token=token))
+
+
+class RTDB:
+    """Blocking, thread-safe counterpart of ``AsyncRTDB``."""
+
+    def __init__(self, database_url, timeout=30.0, max_connections=100):
+        self.aio = AsyncRTDB(database_url, timeout=timeout, max_connections=max_connections)
+
+    def child(self, *args):
+        return Ref(self.aio.child(*args))
+
+    def get_many(self, paths, token=None):
+        return run_sync(self.aio.get_many(paths, token=token))
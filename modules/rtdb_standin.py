@@ -0,0 +1,310 @@
+# modules/rtdb_standin.py
+"""Local in-memory stand-in for the Realtime Database REST API.
+
+Serves ``/<path>.json`` with GET, PUT, PATCH, POST and DELETE, plus the
+``orderBy``/``startAt``/``endAt``/``equalTo``/``limitTo*`` query
+parameters, so the REST backend (``modules/rtdb_async.py``) can be
+exercised without a Firebase project:
+
+    python -m modules.rtdb_standin --port 9000 --rules database.rules.json
+
+then set ``databaseURL`` to ``http://127.0.0.1:9000`` and
+``db_backend = "rest"`` in the Streamlit secrets. With ``--rules``, child
+queries on fields without an ``.indexOn`` entry are rejected with 400, as
+the real service does.
+
+It also answers the three Identity Toolkit calls the login pages make,
+under ``/_auth``. ``StandinAuth`` is a pyrebase-compatible client for
+them, enabled with ``auth_backend = "standin"``.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+from modules.rtdb_async import key_order, order_items, sort_key
+
+
+def apply_query(value, params):
+    """Filter a child map by the RTDB query parameters in ``params``."""
+    order_by = params["orderBy"]
+    items = order_items(value.items(), order_by)
+    # keys compare like the $key ordering: integer keys numerically
+    rank = key_order if order_by == "$key" else sort_key
+
+    def pick(key, child):
+        if order_by == "$key":
+            return key
+        if order_by == "$value":
+            return child
+        return child.get(order_by) if isinstance(child, dict) else None
+
+    if "equalTo" in params:
+        target = rank(params["equalTo"])
+        items = [kv for kv in items if rank(pick(*kv)) == target]
+    if "startAt" in params:
+        low = rank(params["startAt"])
+        items = [kv for kv in items if rank(pick(*kv)) >= low]
+    if "endAt" in params:
+        high = rank(params["endAt"])
+        items = [kv for kv in items if rank(pick(*kv)) <= high]
+    if "limitToFirst" in params:
+        items = items[: params["limitToFirst"]]
+    if "limitToLast" in params:
+        items = items[-params["limitToLast"]:] if params["limitToLast"] else []
+    return dict(items)
+
+
+class Tree:
+    """Thread-safe JSON tree with RTDB write semantics (null deletes)."""
+
+    def __init__(self, data=None, rules=None):
+        self.root = data or {}
+        self.rules = rules
+        self.accounts = {}  # email -> (password, uid)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+    def indexed(self, path, field):
+        """True when ``rules`` declare ``.indexOn`` for ``field`` at ``path``."""
+        if self.rules is None:
+            return True
+        node = self.rules.get("rules", {})
+        for part in self._split(path):
+            if not isinstance(node, dict):
+                return False
+            if part in node:
+                node = node[part]
+            else:
+                wildcard = next((k for k in node if k.startswith("$")), None)
+                if wildcard is None:
+                    return False
+                node = node[wildcard]
+        index = node.get(".indexOn", [])
+        return field in ([index] if isinstance(index, str) else index)
+
+    @staticmethod
+    def _split(path):
+        return [p for p in path.strip("/").split("/") if p]
+
+    def get(self, path):
+        node = self.root
+        for part in self._split(path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def set(self, path, value):
+        parts = self._split(path)
+        if not parts:
+            self.root = value if isinstance(value, dict) else {}
+            return
+        node = self.root
+        trail = []
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            trail.append((node, part))
+            node = node[part]
+        if value is None or value == {}:
+            node.pop(parts[-1], None)
+            # prune empty parents like RTDB does
+            for parent, key in reversed(trail):
+                if parent[key]:
+                    break
+                del parent[key]
+        else:
+            node[parts[-1]] = value
+
+    def update(self, path, values):
+        base = path.strip("/")
+        for key, value in values.items():
+            self.set(f"{base}/{key}" if base else key, value)
+
+
+class Handler(BaseHTTPRequestHandler):
+    tree = None  # bound per server in serve()
+
+    def log_message(self, *args):
+        pass
+
+    def _target(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path.endswith(".json"):
+            path = path[: -len(".json")]
+        return path, parse_qs(parts.query)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def _reply(self, value, params, status=200):
+        self._reply_raw(json.dumps(value).encode(), params, status)
+
+    def _reply_raw(self, body, params, status=200):
+        if params.get("print") == ["silent"]:
+            self.send_response(204)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path, params = self._target()
+        query = {
+            k: json.loads(v[0]) for k, v in params.items()
+            if k in ("orderBy", "startAt", "endAt", "equalTo", "limitToFirst", "limitToLast")
+        }
+        order_by = query.get("orderBy")
+        if order_by and not order_by.startswith("$") and not self.tree.indexed(path, order_by):
+            error = f'Index not defined, add ".indexOn": "{order_by}", for path "{path}", to the rules'
+            self._reply({"error": error}, {}, status=400)
+            return
+        with self.tree.lock:
+            self.tree.calls["GET"] += 1
+            value = self.tree.get(path)
+            if order_by and isinstance(value, dict):
+                value = apply_query(value, query)
+            if params.get("shallow") == ["true"] and isinstance(value, dict):
+                value = {k: True for k in value}
+            body = json.dumps(value).encode()
+        self._reply_raw(body, params)
+
+    def do_PUT(self):
+        path, params = self._target()
+        value = self._body()
+        with self.tree.lock:
+            self.tree.calls["PUT"] += 1
+            self.tree.set(path, value)
+        self._reply(value, params)
+
+    def do_PATCH(self):
+        path, params = self._target()
+        values = self._body() or {}
+        with self.tree.lock:
+            self.tree.calls["PATCH"] += 1
+            self.tree.update(path, values)
+        self._reply(values, params)
+
+    def _auth(self, action, body):
+        email, password = body.get("email", ""), body.get("password", "")
+        with self.tree.lock:
+            self.tree.calls[f"auth:{action}"] += 1
+            account = self.tree.accounts.get(email)
+            if action == "signupNewUser":
+                if account:
+                    return 400, {"error": {"message": "EMAIL_EXISTS"}}
+                if len(password) < 6:
+                    return 400, {"error": {"message": "WEAK_PASSWORD : Password should be at least 6 characters"}}
+                account = self.tree.accounts[email] = (password, uuid.uuid4().hex[:28])
+            elif action == "verifyPassword":
+                if not account:
+                    return 400, {"error": {"message": "EMAIL_NOT_FOUND"}}
+                if account[0] != password:
+                    return 400, {"error": {"message": "INVALID_PASSWORD"}}
+            elif action == "getOobConfirmationCode":
+                if not account:
+                    return 400, {"error": {"message": "EMAIL_NOT_FOUND"}}
+                return 200, {"email": email}
+            else:
+                return 404, {"error": {"message": "NOT_FOUND"}}
+        return 200, {
+            "localId": account[1],
+            "email": email,
+            "idToken": uuid.uuid4().hex,
+            "refreshToken": uuid.uuid4().hex,
+            "expiresIn": "3600",
+        }
+
+    def do_POST(self):
+        path, params = self._target()
+        value = self._body()
+        if path.startswith("/_auth/"):
+            status, reply = self._auth(path[len("/_auth/"):], value or {})
+            self._reply(reply, {}, status)
+            return
+        # time-ordered keys, like RTDB push ids
+        key = f"-{time.time_ns():x}{uuid.uuid4().hex[:6]}"
+        with self.tree.lock:
+            self.tree.calls["POST"] += 1
+            self.tree.set(f"{path}/{key}", value)
+        self._reply({"name": key}, params)
+
+    def do_DELETE(self):
+        path, params = self._target()
+        with self.tree.lock:
+            self.tree.calls["DELETE"] += 1
+            self.tree.set(path, None)
+        self._reply(None, params)
+
+
+class StandinAuth:
+    """Pyrebase ``Auth`` look-alike that signs in against the stand-in."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/")
+        self.client = httpx.Client(timeout=30.0)
+        self.current_user = None
+
+    def _post(self, action, payload):
+        resp = self.client.post(f"{self.url}/_auth/{action}", json=payload)
+        if resp.status_code >= 400:
+            # same shape as pyrebase's HTTPError: status plus the JSON body
+            raise httpx.HTTPStatusError(
+                f"{resp.status_code}: {resp.text}", request=resp.request, response=resp
+            )
+        return resp.json()
+
+    def sign_in_with_email_and_password(self, email, password):
+        self.current_user = self._post("verifyPassword", {"email": email, "password": password})
+        return self.current_user
+
+    def create_user_with_email_and_password(self, email, password):
+        return self._post("signupNewUser", {"email": email, "password": password})
+
+    def send_password_reset_email(self, email):
+        return self._post("getOobConfirmationCode", {"email": email})
+
+
+def serve(host="127.0.0.1", port=0, data=None, rules=None):
+    """Start a stand-in server in a daemon thread.
+
+    Returns ``(server, url)``; ``server.tree`` exposes the data and the
+    per-method call counters. Stop it with ``server.shutdown()``.
+    """
+    tree = Tree(data, rules)
+    handler = type("BoundHandler", (Handler,), {"tree": tree})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.tree = tree
+    threading.Thread(target=server.serve_forever, name="rtdb-standin", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RTDB REST stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--rules", help="database.rules.json to enforce .indexOn")
+    args = parser.parse_args()
+    rules = None
+    if args.rules:
+        with open(args.rules) as f:
+            rules = json.load(f)
+    server, url = serve(args.host, args.port, rules=rules)
+    print(f"RTDB stand-in listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,219 @@
+# modules/schema.py
+"""Record schema, normalised at write time.
+
+Every record written under ``users/<uid>/records`` goes through
+``normalize`` first, so readers can rely on the stored types:
+
+* dates are epoch-day integers (days since 1970-01-01)
+* ``created_at`` is epoch seconds
+* prices are floats
+* ``gender`` is ``"male"``/``"female"`` and ``condition`` is one of
+  ``CONDITIONS`` (or empty when none was recorded); older free text maps
+  to the condition it names and is kept as ``condition_note``
+* every record carries ``schema_version``
+
+``migrate`` rewrites a farm's existing records once; it runs at login
+and records ``schema_version`` on the user node. Rows that cannot be
+normalised are moved to ``users/<uid>/quarantine`` instead of being
+dropped.
+"""
+import math
+import re
+from datetime import date, datetime
+
+SCHEMA_VERSION = 1
+
+GENDERS = ("male", "female")
+CONDITIONS = ("healthy", "sick", "weak", "injured", "recovering", "other")
+# sensor telemetry (modules/telemetry.py): kg, °C, activity index
+METRICS = ("weight", "temperature", "activity")
+
+EPOCH = date(1970, 1, 1)
+
+# words in legacy free text -> condition, most serious first
+_CONDITION_WORDS = [
+    ("sick", re.compile(r"\b(sick|ill(ness)?\b|unwell|not (healthy|well))")),
+    ("weak", re.compile(r"\bweak")),
+    ("injured", re.compile(r"\b(injur|wound|lame|limp)")),
+    ("recovering", re.compile(r"\brecover")),
+    ("healthy", re.compile(r"\b(healthy|well|fine)\b")),
+]
+
+
+# =============================================
+# CONVERTERS
+# =============================================
+def to_epoch_day(value) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"Not a date: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    elif isinstance(value, str):
+        value = date.fromisoformat(value.strip()[:10])
+    if not isinstance(value, date):
+        raise ValueError(f"Not a date: {value!r}")
+    return (value - EPOCH).days
+
+
+def from_epoch_day(day: int) -> date:
+    return date.fromordinal(EPOCH.toordinal() + day)
+
+
+def to_epoch_seconds(value) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"Not a timestamp: {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if not isinstance(value, datetime):
+        raise ValueError(f"Not a timestamp: {value!r}")
+    return int(value.timestamp())
+
+
+def _text(value):
+    return "" if value is None else str(value).strip()
+
+
+def _required(value):
+    text = _text(value)
+    if not text:
+        raise ValueError("Required field is empty")
+    return text
+
+
+def _price(value):
+    price = float(value)
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f"Invalid price: {value!r}")
+    return price
+
+
+def _gender(value):
+    text = _text(value).lower()
+    if text.startswith("m"):
+        return "male"
+    if text.startswith("f"):
+        return "female"
+    raise ValueError(f"Invalid gender: {value!r}")
+
+
+def _condition(value):
+    """``(condition, note)``; free text maps to the condition it names."""
+    text = _text(value)
+    if not text or text.lower() in CONDITIONS:
+        return text.lower(), None
+    lowered = text.lower()
+    for condition, pattern in _CONDITION_WORDS:
+        if pattern.search(lowered):
+            return condition, text
+    return "other", text
+
+
+KINDS = {
+    "text": _text,
+    "required": _required,
+    "day": to_epoch_day,
+    "seconds": to_epoch_seconds,
+    "price": _price,
+    "gender": _gender,
+}
+
+# field -> kind; "condition" is handled separately (keeps free text as a note)
+SCHEMAS = {
+    "goats": {
+        "tag_number": "required", "breed": "required", "gender": "gender",
+        "dob": "day", "created_at": "seconds",
+    },
+    "breeding": {
+        "female_id": "required", "male_id": "required",
+        "mating_date": "day", "expected_birth": "day",
+    },
+    "health": {
+        "goat_id": "required", "condition": "condition", "treatment": "text",
+        "checkup_date": "day",
+    },
+    "sales": {
+        "goat_id": "required", "buyer_name": "text", "price": "price", "sale_date": "day",
+    },
+    "user_profile": {
+        "full_name": "required", "phone": "text", "location": "text",
+    },
+}
+
+
+# =============================================
+# NORMALIZE
+# =============================================
+def normalize(collection: str, data: dict) -> dict:
+    """Return a typed copy of ``data``; raises ValueError if it is invalid."""
+    if collection not in SCHEMAS:
+        raise ValueError(f"Unknown collection: {collection}")
+    if not isinstance(data, dict):
+        raise ValueError(f"Record is not an object: {data!r}")
+    out = dict(data)
+    for field, kind in SCHEMAS[collection].items():
+        value = data.get(field)
+        if kind == "condition":
+            # an unrecorded condition stays empty rather than assumed healthy
+            out[field], note = _condition(value)
+            if note:
+                out["condition_note"] = note
+        elif value is None or value == "":
+            if kind == "required":
+                raise ValueError(f"Missing {field}")
+            if kind != "text":
+                out.pop(field, None)
+                continue
+            out[field] = ""
+        else:
+            try:
+                out[field] = KINDS[kind](value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{collection}.{field}: {e}") from e
+    out["schema_version"] = SCHEMA_VERSION
+    return out
+
+
+def display(collection: str, field: str, value):
+    """Format a stored value for tables."""
+    kind = SCHEMAS.get(collection, {}).get(field)
+    if kind == "day" and isinstance(value, int):
+        return from_epoch_day(value).isoformat()
+    if kind == "seconds" and isinstance(value, int):
+        return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+    return value
+
+
+# =============================================
+# MIGRATION
+# =============================================
+def migrate(db, uid, token) -> dict:
+    """Normalise a farm's records once; returns per-collection counts.
+
+    Writes everything in one multi-path update, so a failed migration
+    leaves the data untouched and is retried at the next login.
+    """
+    if db.child("users").child(uid).child("schema_version").get(token=token).val() == SCHEMA_VERSION:
+        return {}
+
+    records = db.child("users").child(uid).child("records").get(token=token).val() or {}
+    updates = {}
+    counts = {}
+    for collection, rows in records.items():
+        if collection not in SCHEMAS or not isinstance(rows, dict):
+            continue
+        done = counts.setdefault(collection, {"migrated": 0, "quarantined": 0})
+        for rid, rec in rows.items():
+            try:
+                updates[f"records/{collection}/{rid}"] = normalize(collection, rec)
+                done["migrated"] += 1
+            except ValueError:
+                updates[f"records/{collection}/{rid}"] = None
+                updates[f"quarantine/{collection}/{rid}"] = rec
+                done["quarantined"] += 1
+    updates["schema_version"] = SCHEMA_VERSION
+    db.child("users").child(uid).update(updates, token=token)
+    return counts
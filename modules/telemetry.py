@@ -0,0 +1,322 @@
+# modules/telemetry.py
+"""Sensor telemetry: buffered ingestion into time-bucketed nodes.
+
+Scales and collars report weight, temperature and activity every few
+minutes per goat. ``TelemetryIngestor`` buffers those readings in
+memory. A background thread writes them in batches, one multi-path
+update per flush, under ``telemetry/<uid>``. This is a top-level tree of
+its own, so reads of ``users/<uid>`` never pull sensor history:
+
+    raw/<goat>/<epoch_day>/<metric>/<ms_of_day>         -> value
+    hourly/<goat>/<metric>/<epoch_hour>/<part>          -> {n, sum, min, max}
+    daily/<goat>/<metric>/<epoch_day>/<part>            -> {n, sum, min, max}
+
+The hourly and daily aggregates are kept up to date in memory as
+readings arrive. Every flush rewrites the buckets it touched, so charts
+and anomaly checks read a few dozen points instead of raw readings.
+
+A bucket can be written from more than one in-memory run: a late or
+backfilled reading after the bucket was evicted, a restart, or a second
+ingestor. Each run writes its own ``<part>`` and never overwrites
+another, and ``read_series`` merges the parts of each bucket.
+
+Raw readings are kept for ``RAW_DAYS`` and hourly aggregates for
+``HOURLY_DAYS``; ``prune`` deletes older nodes. Daily aggregates are
+kept. The ingestor prunes hourly, a few key listings per flush, so a
+pass never holds up the writes.
+
+While writes fail, the batch is kept for the next flush up to
+``max_buffer`` raw readings; past that the oldest are dropped (and
+logged). Their hourly and daily aggregates are still written.
+"""
+import itertools
+import logging
+import threading
+import time
+import uuid
+
+from modules.schema import METRICS
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+RESOLUTIONS = ("hourly", "daily")
+RAW_DAYS = 30
+HOURLY_DAYS = 365
+_BAD_KEY_CHARS = str.maketrans({c: "_" for c in ".#$[]/"})
+
+log = logging.getLogger(__name__)
+
+
+def goat_key(goat_id) -> str:
+    """Goat tag as a valid RTDB key."""
+    return str(goat_id).strip().translate(_BAD_KEY_CHARS)
+
+
+def _aggregate(agg):
+    n, total, lo, hi = agg[:4]
+    return {"n": n, "sum": total, "min": lo, "max": hi}
+
+
+def _merge(parts):
+    """Combine a bucket's parts into one ``{n, sum, min, max, mean}``."""
+    if "n" in parts:  # a single aggregate
+        parts = {"": parts}
+    parts = [p for p in parts.values() if isinstance(p, dict) and p.get("n")]
+    if not parts:
+        return None
+    n = sum(p["n"] for p in parts)
+    total = sum(p["sum"] for p in parts)
+    return {
+        "n": n,
+        "sum": total,
+        "min": min(p["min"] for p in parts),
+        "max": max(p["max"] for p in parts),
+        "mean": total / n,
+    }
+
+
+def _root(db, uid):
+    return db.child("telemetry").child(uid)
+
+
+class TelemetryIngestor:
+    """Buffer readings and write them in batches from a background thread.
+
+    ``add`` only touches in-memory state, so it is safe to call from many
+    sensor threads. Pass a database handle that is not shared with the
+    pages (``app.open_database()``). ``token`` may be replaced while the
+    ingestor is running, for example when the ID token is refreshed.
+
+        with TelemetryIngestor(db, uid, token) as ingest:
+            ingest.add("T12", "temperature", 39.1)
+    """
+
+    def __init__(self, db, uid, token, batch_size=5000, flush_interval=2.0, max_paths=20000,
+                 prune_interval=3600.0, prune_reads=8, max_buffer=100_000):
+        self.db = db
+        self.uid = uid
+        self.token = token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_paths = max_paths
+        self.prune_interval = prune_interval
+        self.prune_reads = prune_reads
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._raw = []          # (goat, metric, ts_ms, value)
+        self._buckets = {}      # (resolution, goat, metric, index) -> [n, sum, min, max, part]
+        self._writer = uuid.uuid4().hex[:8]
+        self._parts = itertools.count()
+        self._touched = set()
+        self._latest_ms = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+        self._thread.start()
+
+    # ----- INGEST -----
+    def add(self, goat_id, metric, value, ts=None):
+        """Record one reading; ``ts`` is epoch seconds (default: now)."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        value = float(value)
+        ts_ms = int((time.time() if ts is None else ts) * 1000)
+        goat = goat_key(goat_id)
+        hour_key = ("hourly", goat, metric, ts_ms // HOUR_MS)
+        day_key = ("daily", goat, metric, ts_ms // DAY_MS)
+        with self._lock:
+            self._raw.append((goat, metric, ts_ms, value))
+            for key in (hour_key, day_key):
+                agg = self._buckets.get(key)
+                if agg is None:
+                    # a new part, so an aggregate already stored for this
+                    # bucket (earlier run, other writer) is kept, not replaced
+                    part = f"{self._writer}-{next(self._parts)}"
+                    self._buckets[key] = [1, value, value, value, part]
+                else:
+                    agg[0] += 1
+                    agg[1] += value
+                    if value < agg[2]:
+                        agg[2] = value
+                    if value > agg[3]:
+                        agg[3] = value
+            self._touched.add(hour_key)
+            self._touched.add(day_key)
+            if ts_ms > self._latest_ms:
+                self._latest_ms = ts_ms
+            full = len(self._raw) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def add_many(self, readings):
+        """Record ``(goat_id, metric, value, ts)`` tuples."""
+        for goat_id, metric, value, ts in readings:
+            self.add(goat_id, metric, value, ts)
+
+    # ----- FLUSH -----
+    def _take(self):
+        with self._lock:
+            raw, self._raw = self._raw, []
+            touched, self._touched = self._touched, set()
+            aggregates = {key + (self._buckets[key][4],): _aggregate(self._buckets[key]) for key in touched}
+            # closed buckets are final once written; keep one spare of each
+            hour_floor = self._latest_ms // HOUR_MS - 1
+            day_floor = self._latest_ms // DAY_MS - 1
+            for key in [k for k in self._buckets if k not in touched]:
+                if key[3] < (hour_floor if key[0] == "hourly" else day_floor):
+                    del self._buckets[key]
+        return raw, touched, aggregates
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of readings."""
+        with self._flush_lock:
+            raw, touched, aggregates = self._take()
+            if not raw and not aggregates:
+                return 0
+            payload = {}
+            for goat, metric, ts_ms, value in raw:
+                day, ms = divmod(ts_ms, DAY_MS)
+                payload[f"raw/{goat}/{day}/{metric}/{ms}"] = value
+            for (resolution, goat, metric, index, part), agg in aggregates.items():
+                payload[f"{resolution}/{goat}/{metric}/{index}/{part}"] = agg
+            try:
+                self._write(payload)
+            except Exception:
+                # put the batch back so the next flush retries it
+                with self._lock:
+                    self._raw[:0] = raw
+                    self._touched |= touched
+                    overflow = len(self._raw) - self.max_buffer
+                    if overflow > 0:
+                        del self._raw[:overflow]
+                        self.dropped += overflow
+                if overflow > 0:
+                    log.warning("Telemetry buffer full; dropped the %d oldest readings", overflow)
+                raise
+            self.written += len(raw)
+            return len(raw)
+
+    def _write(self, payload):
+        items = list(payload.items())
+        for i in range(0, len(items), self.max_paths):
+            chunk = dict(items[i:i + self.max_paths])
+            _root(self.db, self.uid).update(chunk, token=self.token)
+
+    def _run(self):
+        next_prune = time.monotonic()
+        pruning = None
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Telemetry flush failed; will retry")
+            if pruning is None and time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + self.prune_interval
+                pruning = _pruner(self.db, self.uid, self.token, self.max_paths)
+            if pruning is not None:
+                # a few shallow reads per cycle, so flushing is never held up
+                try:
+                    for _ in range(self.prune_reads):
+                        next(pruning)
+                except StopIteration:
+                    pruning = None
+                except Exception:
+                    log.exception("Telemetry pruning failed; will retry")
+                    pruning = None
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =============================================
+# RETENTION
+# =============================================
+def _keys(db, uid, token, path) -> list:
+    """Child keys of ``telemetry/<uid>/<path>`` without their values."""
+    ref = _root(db, uid)
+    for part in path.split("/"):
+        ref = ref.child(part)
+    found = ref.shallow().get(token=token).val()
+    return list(found or []) if not isinstance(found, (str, int, float, bool)) else []
+
+
+def _expired(db, uid, token, raw_days=RAW_DAYS, hourly_days=HOURLY_DAYS, now=None):
+    """Yield the expired paths found by each shallow read (often none)."""
+    now_ms = int((time.time() if now is None else now) * 1000)
+    raw_floor = now_ms // DAY_MS - raw_days
+    hour_floor = now_ms // HOUR_MS - hourly_days * 24
+    goats = _keys(db, uid, token, "raw")
+    yield []
+    for goat in goats:
+        days = _keys(db, uid, token, f"raw/{goat}")
+        yield [f"raw/{goat}/{day}" for day in days if int(day) < raw_floor]
+    goats = _keys(db, uid, token, "hourly")
+    yield []
+    for goat in goats:
+        metrics = _keys(db, uid, token, f"hourly/{goat}")
+        yield []
+        for metric in metrics:
+            hours = _keys(db, uid, token, f"hourly/{goat}/{metric}")
+            yield [f"hourly/{goat}/{metric}/{hour}" for hour in hours if int(hour) < hour_floor]
+
+
+def _pruner(db, uid, token, max_paths=20000, **retention):
+    """``prune`` one shallow read per step; deletes go out ``max_paths`` at a time."""
+    deletes = []
+    for expired in _expired(db, uid, token, **retention):
+        deletes += expired
+        while len(deletes) >= max_paths:
+            _root(db, uid).update(dict.fromkeys(deletes[:max_paths]), token=token)
+            del deletes[:max_paths]
+        yield len(expired)
+    if deletes:
+        _root(db, uid).update(dict.fromkeys(deletes), token=token)
+
+
+def prune(db, uid, token, raw_days=RAW_DAYS, hourly_days=HOURLY_DAYS, now=None, max_paths=20000) -> int:
+    """Delete raw days and hourly buckets past retention; returns the count.
+
+    Only keys are listed (shallow reads), so pruning never downloads the
+    readings themselves.
+    """
+    steps = _pruner(db, uid, token, max_paths, raw_days=raw_days, hourly_days=hourly_days, now=now)
+    return sum(steps)
+
+
+# =============================================
+# READ
+# =============================================
+def read_series(db, uid, token, goat_id, metric, resolution="hourly", start=None, end=None) -> list:
+    """Aggregates for one goat and metric, oldest first.
+
+    ``start``/``end`` are bucket indexes (epoch hours or epoch days) and
+    are pushed down as a key range. Returns ``[(index, aggregate), ...]``.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    ref = _root(db, uid).child(resolution).child(goat_key(goat_id)).child(metric)
+    if start is not None or end is not None:
+        ref = ref.order_by_key()
+        if start is not None:
+            ref = ref.start_at(str(start))
+        if end is not None:
+            ref = ref.end_at(str(end))
+    found = ref.get(token=token).val() or {}
+    if isinstance(found, list):  # RTDB returns dense integer keys as arrays
+        found = {i: v for i, v in enumerate(found) if v is not None}
+    series = ((int(k), _merge(v)) for k, v in found.items() if isinstance(v, dict))
+    return sorted((k, agg) for k, agg in series if agg is not None)
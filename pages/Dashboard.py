@@ -24,6 +24,7 @@ id_token = user["idToken"]
 import sys, os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app import db
+from modules import leaderboard, schema
 
 # =============================================
 # 4. HELPER: Safe .val()
@@ -34,10 +35,10 @@ def get_val(resp):
 # =============================================
 # 5. FETCH FARM DATA
 # =============================================
-farm_resp = db.child("users").child(uid).get(token=id_token)
-farm_data = get_val(farm_resp)
-farm_name = farm_data.get("farm_name", "My Farm")
-created_at = farm_data.get("created_at")
+# only the two fields needed; the user node also holds records,
+# leaderboards and report snapshots
+farm_name = db.child("users").child(uid).child("farm_name").get(token=id_token).val() or "My Farm"
+created_at = db.child("users").child(uid).child("created_at").get(token=id_token).val()
 
 # =============================================
 # 6. PAGE CONFIG (MOBILE FRIENDLY)
@@ -61,7 +62,7 @@ workers = get_val(db.child("users").child(uid).child("records").child("user_prof
 # 8. CALCULATE METRICS
 # =============================================
 total_goats = len(goats)
-males = sum(1 for g in goats.values() if str(g.get("gender") or "").lower().startswith("m"))
+males = sum(1 for g in goats.values() if g.get("gender") == "male")
 females = total_goats - males
 pregnant_count = len(breeding)
 total_workers = len(workers)
@@ -122,7 +123,8 @@ else:
 if breeding:
     df_breed = pd.DataFrame(list(breeding.values()))
     if "mating_date" in df_breed.columns:
-        df_breed["Month"] = pd.to_datetime(df_breed["mating_date"], errors="coerce").dt.strftime("%b")
+        # mating_date is stored as epoch days (modules/schema.py)
+        df_breed["Month"] = pd.to_datetime(df_breed["mating_date"], unit="D").dt.strftime("%b")
         trend = df_breed["Month"].value_counts().sort_index()
         st.markdown("### 🐐 Breeding Activity Over Time")
         st.bar_chart(trend)
@@ -130,3 +132,15 @@ if breeding:
         st.info("Breeding records exist but no valid date field found.")
 else:
     st.info("No breeding records available yet.")
+
+# --- Top Sales This Month ---
+st.markdown("### 🏆 Top Sales This Month")
+this_month = leaderboard.periods(schema.to_epoch_day(datetime.now().date()))[-1]
+top_month = leaderboard.top(db, uid, id_token, this_month)
+if top_month:
+    st.dataframe(pd.DataFrame([
+        {"Goat ID": t["goat_id"], "Price (Ksh)": t["price"], "Date": t["date"]}
+        for t in top_month
+    ]), use_container_width=True, hide_index=True)
+else:
+    st.info("No sales recorded this month yet.")
@@ -20,7 +20,9 @@ id_token = user["idToken"]
 # 2. IMPORT DB
 # =============================================
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from app import db
+from app import db, open_database
+from modules.query import Query
+from modules import leaderboard, reports, schema, telemetry
 
 # =============================================
 # 3. HELPERS
@@ -29,14 +31,25 @@ def gen_id():
     return str(uuid.uuid4())
 
 def add_record(collection: str, data: dict):
+    try:
+        data = schema.normalize(collection, data)
+    except ValueError as e:
+        st.error(f"Invalid {collection} record: {e}")
+        return
     rid = gen_id()
     db.child("users").child(uid).child("records").child(collection).child(rid).set(data, token=id_token)
+    if collection == "sales":
+        leaderboard.record_sale(db, uid, id_token, rid, data)
+    reports.schedule_refresh(open_database(), uid, id_token)
     st.success(f"{collection.title()} added!")
 
-def delete_record(collection: str, rid: str):
+def delete_record(collection: str, rid: str, rec: dict = None):
     """Delete one record from Firebase"""
     try:
         db.child("users").child(uid).child("records").child(collection).child(rid).remove(token=id_token)
+        if collection == "sales":
+            leaderboard.remove_sale(db, uid, id_token, rid, rec)
+        reports.schedule_refresh(open_database(), uid, id_token)
         st.success("Deleted successfully!")
         st.session_state["deleted"] = True
         st.rerun()
@@ -86,10 +99,11 @@ def show_table(collection: str, records: dict, columns: list):
         for i, col_name in enumerate(columns):
             with cols[i]:
                 label = col_name.replace("_", " ")
-                st.text(f"{label}: {rec.get(col_name.lower(), '—')}")
+                value = schema.display(collection, col_name.lower(), rec.get(col_name.lower(), '—'))
+                st.text(f"{label}: {value}")
         with cols[-1]:
             if st.button("🗑️ Delete", key=f"del_{collection}_{rid}"):
-                delete_record(collection, rid)
+                delete_record(collection, rid, rec)
         st.divider()  # separator between entries
 
 # =============================================
@@ -111,7 +125,37 @@ with tabs[1]:
 # =============================================
 with tabs[2]:
     st.subheader("💊 Health Records")
-    show_table("health", health, ["Goat_Id", "Condition", "Treatment", "Checkup_Date"])
+    show_table("health", health, ["Goat_Id", "Condition", "Condition_Note", "Treatment", "Checkup_Date"])
+
+    # --- Sensor telemetry (hourly/daily aggregates, see modules/telemetry.py) ---
+    with st.expander("📡 Sensor Telemetry"):
+        tags = sorted(g.get("tag_number", "") for g in goats.values())
+        if not tags:
+            st.info("Add goats to see their sensor readings.")
+        else:
+            c1, c2, c3 = st.columns(3)
+            tag = c1.selectbox("Goat", tags, key="tel_goat")
+            metric = c2.selectbox("Metric", schema.METRICS, key="tel_metric")
+            resolution = c3.selectbox("Resolution", telemetry.RESOLUTIONS, key="tel_res")
+            unit_ms = telemetry.HOUR_MS if resolution == "hourly" else telemetry.DAY_MS
+            end = int(datetime.now().timestamp() * 1000) // unit_ms
+            start = end - (7 * 24 if resolution == "hourly" else 90)
+            series = telemetry.read_series(db, uid, id_token, tag, metric, resolution, start, end)
+            if not series:
+                st.info("No sensor readings for this goat yet.")
+            else:
+                df_tel = pd.DataFrame({
+                    "Time": pd.to_datetime([i * unit_ms for i, _ in series], unit="ms"),
+                    "Min": [a["min"] for _, a in series],
+                    "Mean": [a["mean"] for _, a in series],
+                    "Max": [a["max"] for _, a in series],
+                }).set_index("Time")
+                st.line_chart(df_tel)
+                means = df_tel["Mean"]
+                if len(means) >= 8 and means.std() > 0:
+                    unusual = int((((means - means.mean()) / means.std()).abs() > 3).sum())
+                    if unusual:
+                        st.warning(f"⚠️ {unusual} unusual {metric} reading(s) for {tag} in this period.")
 
 # =============================================
 # 11. SALES
@@ -135,27 +179,21 @@ with tabs[5]:
     recs = []
 
     if breeding:
-        today = datetime.now().date()
-        due_soon = 0
-        for b in breeding.values():
-            try:
-                exp = datetime.fromisoformat(b.get("expected_birth", "").split("T")[0]).date()
-                if (exp - today).days <= 7:
-                    due_soon += 1
-            except:
-                pass
+        week_ahead = schema.to_epoch_day(datetime.now().date()) + 7
+        # rows are already loaded above, so filter them here instead of re-querying
+        due_soon = len(Query("breeding").where("expected_birth", "<=", week_ahead).filter(breeding))
         if due_soon:
             recs.append(f"{due_soon} goat(s) due within 7 days — prepare for delivery! 🍼")
         else:
             recs.append("No goats due soon.")
 
-    sick = len([h for h in health.values() if h.get("condition", "").lower() in ["sick", "weak"]])
+    sick = len(Query("health").where("condition", "in", ["sick", "weak"]).filter(health))
     if sick:
         recs.append(f"{sick} goat(s) need urgent care 🩺.")
     else:
         recs.append("All goats healthy ✅.")
 
-    total_sales = sum(float(s.get("price", 0)) for s in sales.values())
+    total_sales = sum(s.get("price", 0) for s in sales.values())
     recs.append(f"Total sales: **Ksh {total_sales:,.0f}**")
     recs.append(f"Total goats: **{len(goats)}**")
 
@@ -183,8 +221,8 @@ with st.sidebar:
                         "tag_number": tag,
                         "breed": breed,
                         "gender": gender,
-                        "dob": str(dob),
-                        "created_at": datetime.now().isoformat()
+                        "dob": dob,
+                        "created_at": datetime.now()
                     })
                 else:
                     st.error("Please fill all required fields.")
@@ -202,8 +240,8 @@ with st.sidebar:
                     add_record("breeding", {
                         "female_id": f,
                         "male_id": m,
-                        "mating_date": str(mate),
-                        "expected_birth": str(exp)
+                        "mating_date": mate,
+                        "expected_birth": exp
                     })
                 else:
                     st.error("Female and Male tags are required.")
@@ -212,18 +250,22 @@ with st.sidebar:
     elif rec_type == "Health":
         with st.form("add_health", clear_on_submit=True):
             g = st.text_input("Goat Tag *")
-            c = st.text_input("Condition")
+            c = st.selectbox("Condition", schema.CONDITIONS)
+            note = st.text_input("Condition details (for \"other\")")
             t = st.text_input("Treatment")
             d = st.date_input("Check-up Date")
             submitted = st.form_submit_button("Save Health Record")
             if submitted:
                 if g:
-                    add_record("health", {
+                    record = {
                         "goat_id": g,
                         "condition": c,
                         "treatment": t,
-                        "checkup_date": str(d)
-                    })
+                        "checkup_date": d
+                    }
+                    if c == "other" and note.strip():
+                        record["condition_note"] = note.strip()
+                    add_record("health", record)
                 else:
                     st.error("Goat tag is required.")
 
@@ -241,7 +283,7 @@ with st.sidebar:
                         "goat_id": g,
                         "buyer_name": b,
                         "price": p,
-                        "sale_date": str(d)
+                        "sale_date": d
                     })
                 else:
                     st.error("Goat tag is required.")